@@ -1,27 +1,91 @@
 import os
 import fnmatch
+import functools
+import re
 import argparse
+import codecs
 import sys
-import io       # Added for comment stripping
-import tokenize # Added for comment stripping
+import collections
+import concurrent.futures
+from io import StringIO # Added for comment stripping
+from tokenize import COMMENT, generate_tokens, untokenize # Added for comment stripping
+
+# Like git, a NUL byte within this many leading bytes marks a file as binary.
+_SNIFF_SIZE = 8192
+# Buffer size for the bundle and input files, and chunk size for streaming copies.
+_IO_BUFFER_SIZE = 1 << 20
+# Unstripped files at least this large are streamed instead of read whole.
+_STREAM_THRESHOLD = 1 << 20
+_HAVE_FADVISE = hasattr(os, 'posix_fadvise')
+
+# Bundle markers, prebuilt as bytes for the binary output stream.
+_TREE_HEADER = b'# --- Project Structure ---\n\n'
+_SECTION_HEADER = b'\n\n# --- Concatenated Files ---\n\n'
+_FILE_HEADER = b'# --- File: '
+_FILE_FOOTER = b'# --- End of File: '
+_MARKER_END = b' ---\n'
+_BINARY_PLACEHOLDER = b'binary file\n'
 
 def load_exclusions(config_file):
-    """Load exclusion patterns and names from config file."""
-    exclusions = []
+    """
+    Load exclusion patterns and names from config file.
+    Returns a (literal_names, glob_regex) pair: exact names go into a frozenset,
+    glob patterns are translated once and combined into a single compiled regex.
+    """
+    literals = set()
+    globs = []
     if os.path.exists(config_file):
         with open(config_file, 'r', encoding='utf-8') as f:
             for line in f:
                 line = line.strip()
                 if line and not line.startswith('#'):
-                    exclusions.append(line)
-    return exclusions
+                    # Normalise case the same way fnmatch.fnmatch does.
+                    line = os.path.normcase(line)
+                    if any(c in line for c in '*?['):
+                        globs.append(line)
+                    else:
+                        literals.add(line)
+    if globs:
+        glob_regex = re.compile('(?:' + '|'.join(fnmatch.translate(p) for p in globs) + ')')
+    else:
+        glob_regex = re.compile('(?!)')  # Never matches
+    return frozenset(literals), glob_regex
 
 def is_excluded(name, exclusions):
     """Check if a file or directory name matches any exclusion."""
-    for pattern in exclusions:
-        if fnmatch.fnmatch(name, pattern) or name == pattern:
-            return True
-    return False
+    name = os.path.normcase(name)
+    return name in exclusions[0] or exclusions[1].match(name) is not None
+
+def build_exclusion_matcher(exclusions):
+    """
+    Return a memoised is_excluded predicate for the given exclusions.
+    Walks ask about the same basenames (__pycache__, .git, ...) at every level,
+    so each decision is cached per name. Build a fresh matcher per run.
+    """
+    @functools.lru_cache(maxsize=4096)
+    def _excluded(name):
+        return is_excluded(name, exclusions)
+
+    return _excluded
+
+# Matches a string literal (group 1, kept) or a comment with the blanks before it (dropped).
+# Triple-quoted forms come first so they win over the single-quoted ones.
+_PY_COMMENT_RE = re.compile(
+    r'("""(?:\\.|[^\\])*?"""'
+    r"|'''(?:\\.|[^\\])*?'''"
+    r'|"(?:\\.|[^"\\\n])*"'
+    r"|'(?:\\.|[^'\\\n])*')"
+    r'|[ \t]*#[^\n]*',
+    re.DOTALL,
+)
+
+def _core_remove_python_comments_regex(code_string):
+    """
+    Core helper to remove hash (#) comments from a Python code string in one regex pass.
+    String literals are matched and kept as-is, so a '#' inside a string survives.
+    Like the tokenize helper, this may leave blank or whitespace-only lines behind.
+    """
+    return _PY_COMMENT_RE.sub(r'\1', code_string)
 
 def _core_remove_python_comments_tokenize(code_string):
     """
@@ -29,152 +93,320 @@ def _core_remove_python_comments_tokenize(code_string):
     This step removes comment text but may leave blank lines or whitespace-only lines.
     May raise tokenize.TokenError for malformed Python.
     """
-    io_obj = io.StringIO(code_string)
-    filtered_tokens = []
-    # tokenize.generate_tokens can raise tokenize.TokenError for malformed Python
-    for tok_info in tokenize.generate_tokens(io_obj.readline):
-        if tok_info.type != tokenize.COMMENT:
-            filtered_tokens.append(tok_info)
-    
-    return tokenize.untokenize(filtered_tokens)
+    # generate_tokens can raise tokenize.TokenError for malformed Python
+    return untokenize(tok_info for tok_info in generate_tokens(StringIO(code_string).readline)
+                      if tok_info.type != COMMENT)
 
 def remove_blank_lines(text_content):
     """
     Removes lines that are empty or contain only whitespace from a text string.
     Ensures a single trailing newline if the resulting content is not empty.
     """
-    lines = text_content.splitlines()
-    # Keep lines that have some non-whitespace content
-    processed_lines = [line for line in lines if line.strip()]
-    
+    # filter() with str.strip keeps the per-line test in C; no Python-level loop.
+    processed_lines = list(filter(str.strip, text_content.splitlines()))
+
     if not processed_lines:
         return ""  # Return empty string if all lines were blank.
     else:
         # Join lines with a newline and add a trailing newline.
         return "\n".join(processed_lines) + "\n"
 
-def remove_python_comments(code_string):
+def remove_python_comments(code_string, strict=False):
     """
     Removes hash (#) comments and blank lines from a Python code string.
-    Uses the tokenize module for robust comment detection.
+    By default a precompiled regex that skips over string literals finds the comments;
+    it is much faster than tokenize and leaves the remaining code untouched.
     - End-of-line comments are removed.
     - Lines that consisted only of comments (and potentially whitespace) are removed entirely.
     - Pre-existing blank lines (or lines with only whitespace) in the code are also removed.
-    
-    This function may reformat whitespace slightly due to tokenize.untokenize.
-    The output, if non-empty, will end with a single newline character.
-    If tokenizing fails (e.g., due to syntax errors in the Python code),
-    this function will raise an error (e.g., tokenize.TokenError),
+
+    With strict=True the tokenize module is used instead, for files the regex gets wrong.
+    That path may reformat whitespace slightly due to tokenize.untokenize, and
+    if tokenizing fails (e.g., due to syntax errors in the Python code)
+    it will raise an error (e.g., tokenize.TokenError),
     which is expected to be handled by the caller.
+    The output, if non-empty, will end with a single newline character.
     """
-    # Step 1: Use tokenize to remove comment text robustly.
-    # This can raise tokenize.TokenError, which will propagate.
-    code_stripped_of_comment_text = _core_remove_python_comments_tokenize(code_string)
+    # Step 1: Remove comment text.
+    if strict:
+        # This can raise tokenize.TokenError, which will propagate.
+        code_stripped_of_comment_text = _core_remove_python_comments_tokenize(code_string)
+    else:
+        code_stripped_of_comment_text = _core_remove_python_comments_regex(code_string)
 
     # Step 2: Remove lines that are now blank or contain only whitespace.
     return remove_blank_lines(code_stripped_of_comment_text)
 
 
-def generate_tree_structure(root_dir, exclusions):
+def _walk_project(root_dir, excluded, sort_entries=True):
+    """
+    Walk root_dir top-down with os.scandir, like a sorted os.walk.
+    Yields (dirpath, subdirs, files) where subdirs and files are name-sorted
+    lists of non-excluded os.DirEntry objects; pass sort_entries=False when
+    the caller orders the results itself. Entry types come from the cached
+    d_type, so regular entries cost no extra stat. As with os.walk, symlinked
+    directories are not descended into and unreadable directories are skipped.
+    """
+    stack = collections.deque([root_dir])
+    while stack:
+        dirpath = stack.pop()
+        subdirs = []
+        files = []
+        try:
+            with os.scandir(dirpath) as it:
+                for entry in it:
+                    # Excluded names are dropped here, before any list or type check sees them.
+                    if excluded(entry.name):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry)
+                    else:
+                        try:
+                            is_dir_link = entry.is_dir()
+                        except OSError:
+                            is_dir_link = False
+                        if not is_dir_link:
+                            files.append(entry)
+        except OSError:
+            continue
+
+        if sort_entries:
+            subdirs.sort(key=lambda e: e.name)
+            files.sort(key=lambda e: e.name)
+        yield dirpath, subdirs, files
+        # Pushed in reverse so the first subdirectory is visited next.
+        stack.extend(e.path for e in reversed(subdirs))
+
+def generate_tree_structure(root_dir, excluded):
     """Return a text tree of the project structure, excluding patterns."""
     lines = []
-    for dirpath, dirnames, filenames in os.walk(root_dir, topdown=True):
-        dirnames[:] = sorted([d for d in dirnames if not is_excluded(d, exclusions)])
-        current_files = sorted([f for f in filenames if not is_excluded(f, exclusions)])
-        relative_dirpath = os.path.relpath(dirpath, root_dir)
-        
-        if relative_dirpath == ".":
+    # Walk from the absolute root so relative paths are a plain slice of each path.
+    root_path = os.path.abspath(root_dir)
+    root_prefix = root_path if root_path.endswith(os.sep) else root_path + os.sep
+    for dirpath, _, current_files in _walk_project(root_path, excluded):
+        if dirpath == root_path:
             level = 0
-            dir_display_name = os.path.basename(os.path.abspath(root_dir)) + '/' if root_dir != '.' else './'
+            dir_display_name = os.path.basename(root_path) + '/' if root_dir != '.' else './'
             lines.append(f'{dir_display_name}')
         else:
-            level = relative_dirpath.count(os.sep) + (1 if os.sep != '.' else 0)
+            level = dirpath[len(root_prefix):].count(os.sep) + 1
             dir_display_name = os.path.basename(dirpath) + '/'
             indent = ' ' * 4 * level
             lines.append(f'{indent}{dir_display_name}')
         
         sub_indent = ' ' * 4 * (level + 1)
-        for filename_in_tree in current_files:
-            lines.append(f'{sub_indent}{filename_in_tree}')
+        for file_entry in current_files:
+            lines.append(f'{sub_indent}{file_entry.name}')
             
     return '\n'.join(lines)
 
-def concatenate_files(root_dir, exclusions, output_file, args):
+def _advise_sequential(fin):
+    """
+    Tell the kernel fin is about to be read once from start to end, so it reads ahead eagerly.
+    The hint is best-effort: it is skipped where posix_fadvise is missing and failures are ignored.
+    """
+    if _HAVE_FADVISE:
+        try:
+            os.posix_fadvise(fin.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+
+def _looks_binary(data):
+    """Return True if data (the start of a file) has a NUL byte in its sniff window."""
+    return data.find(b'\x00', 0, _SNIFF_SIZE) != -1
+
+def _normalize_newlines(data):
+    """Translate CRLF and lone CR line endings to LF, as text-mode reading does."""
+    if b'\r' in data:
+        data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    return data
+
+def _stream_utf8_file(fin, fout):
+    """
+    Copy a large UTF-8 file from binary fin into fout in 1 MiB chunks,
+    translating newlines like text mode does and adding a trailing newline
+    if the file lacks one. Returns False, having written nothing, if the
+    first bytes show the file is binary.
+    If undecodable bytes turn up after output has started, the partial copy is
+    truncated off fout and the error re-raised, so the caller sees the same
+    outcome as when decoding the whole file up front.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    data = fin.read(_SNIFF_SIZE)
+    if _looks_binary(data):
+        return False
+    decoder.decode(data, final=len(data) < _SNIFF_SIZE)
+    start = fout.tell()
+    ends_with_newline = True
+    try:
+        while data:
+            chunk = fin.read(_IO_BUFFER_SIZE)
+            decoder.decode(chunk, final=not chunk)
+            if chunk and data.endswith(b'\r'):
+                # Keep a CRLF split across chunks together.
+                data = data[:-1]
+                chunk = b'\r' + chunk
+            data = _normalize_newlines(data)
+            if data:
+                fout.write(data)
+                ends_with_newline = data.endswith(b'\n')
+            data = chunk
+    except Exception:
+        fout.seek(start)
+        fout.truncate()
+        raise
+    if not ends_with_newline:
+        fout.write(b'\n')
+    return True
+
+def _render_file_body(full_path, rel_path, args):
+    """
+    Read one file and apply the requested stripping, returning its bundle body as bytes.
+    Runs on worker threads; errors are turned into the usual placeholder text.
+    Returns None for large unstripped files, which the caller streams instead.
+    """
+    current_file_basename = os.path.basename(full_path)
+    is_python_file = current_file_basename.lower().endswith('.py')
+    needs_stripping = args.strip_blank_lines or (args.strip_python_comments and is_python_file)
+
+    try:
+        with open(full_path, 'rb', buffering=_IO_BUFFER_SIZE) as fin:
+            if not needs_stripping and os.fstat(fin.fileno()).st_size >= _STREAM_THRESHOLD:
+                return None
+            # Cheap NUL sniff first, so binaries are neither read in full nor decoded.
+            data = fin.read(_SNIFF_SIZE)
+            if _looks_binary(data):
+                return _BINARY_PLACEHOLDER
+            _advise_sequential(fin)
+            data += fin.read()
+        data = _normalize_newlines(data)
+
+        if not needs_stripping:
+            data.decode('utf-8')  # Raises UnicodeDecodeError for non-UTF-8 files
+            if data and not data.endswith(b'\n'):
+                data += b'\n'
+            return data
+
+        content = data.decode('utf-8')
+
+        # Flag to track if Python-specific processing (which includes blank line removal) occurred
+        python_specific_processing_done = False
+
+        if args.strip_python_comments and is_python_file:
+            try:
+                content = remove_python_comments(content, strict=args.strict) # This also removes blank lines
+                python_specific_processing_done = True
+            except Exception as e_strip:
+                sys.stderr.write(f"Warning: Could not strip comments from {rel_path}: {e_strip}. Using original content.\n")
+
+        # Apply general blank line stripping if requested AND
+        # it's not a Python file OR it's a Python file but comment stripping was not done/enabled.
+        if args.strip_blank_lines:
+            if not is_python_file: # Always apply to non-Python text files
+                content = remove_blank_lines(content)
+            elif is_python_file and not python_specific_processing_done: # Apply to .py only if SPC didn't already
+                content = remove_blank_lines(content)
+
+        # Both remove_python_comments and remove_blank_lines ensure a trailing \n for non-empty output.
+        # This final check handles cases where no stripping was done and the original file lacked a newline.
+        if content and not content.endswith('\n'):
+            content += '\n'
+        return content.encode('utf-8')
+
+    except UnicodeDecodeError:
+        return _BINARY_PLACEHOLDER
+    except Exception as e:
+        sys.stderr.write(f"Error processing file {rel_path}: {e}\n")
+        return f'Error processing file: {e}\n'.encode('utf-8')
+
+def _write_file_entry(fout, full_path, rel_path_header, body_future):
+    """
+    Write one file's header, body and footer to the bundle.
+    A ready body goes out with the header and footer in a single write;
+    a large unstripped file is streamed from disk between them.
+    """
+    path_bytes = rel_path_header.encode('utf-8')
+    buf = bytearray(_FILE_HEADER)
+    buf += path_bytes
+    buf += _MARKER_END
+    footer = b''.join((_FILE_FOOTER, path_bytes, _MARKER_END, b'\n'))
+
+    body = body_future.result()
+    if body is not None:
+        buf += body
+        buf += footer
+        fout.write(buf)
+        return
+
+    fout.write(buf)
+    try:
+        with open(full_path, 'rb', buffering=_IO_BUFFER_SIZE) as fin:
+            _advise_sequential(fin)
+            if not _stream_utf8_file(fin, fout):
+                fout.write(_BINARY_PLACEHOLDER)
+    except UnicodeDecodeError:
+        fout.write(_BINARY_PLACEHOLDER)
+    except Exception as e:
+        sys.stderr.write(f"Error processing file {rel_path_header}: {e}\n")
+        fout.write(f'Error processing file: {e}\n'.encode('utf-8'))
+    fout.write(footer)
+
+def concatenate_files(root_dir, excluded, output_file, args):
     """
     Append all non-excluded files into one output.
     Text files are inlined; binary files get a placeholder.
     Python file comments and/or blank lines can be stripped based on args.
+    Files are read and stripped on a thread pool but written strictly in
+    sorted order, each entry with a single write; only large unstripped
+    files are streamed.
     """
-    with open(output_file, 'a', encoding='utf-8') as fout:
-        fout.write('\n\n# --- Concatenated Files ---\n\n')
+    with open(output_file, 'ab', buffering=_IO_BUFFER_SIZE) as fout:
+        fout.write(_SECTION_HEADER)
         
+        # Walk from root_dir as given, like os.walk(root_dir) did, so full paths (and any
+        # error text built from them) keep the user's form; relative paths are a plain slice.
+        # os.path.join adds a separator exactly where scandir does (not after '/', '\\' or 'C:').
+        root_prefix_len = len(os.path.join(root_dir, ''))
+
+        # (header path, full path) pairs: sorting the tuples orders by header path
+        # without recomputing a key for every comparison.
         paths_to_process = []
-        for dirpath, dirnames, filenames_in_walk in os.walk(root_dir, topdown=True):
-            dirnames[:] = sorted([d for d in dirnames if not is_excluded(d, exclusions)])
-            current_filenames = sorted([f for f in filenames_in_walk if not is_excluded(f, exclusions)])
-            for fname in current_filenames:
-                paths_to_process.append(os.path.join(dirpath, fname))
+        for _, _, current_files in _walk_project(root_dir, excluded, sort_entries=False):
+            for file_entry in current_files:
+                full_path = file_entry.path
+                paths_to_process.append((full_path[root_prefix_len:].replace(os.sep, '/'), full_path))
 
-        paths_to_process.sort(key=lambda p: os.path.relpath(p, root_dir).replace(os.sep, '/'))
+        paths_to_process.sort()
 
-        for full_path in paths_to_process:
-            rel_path = os.path.relpath(full_path, root_dir)
-            rel_path_header = rel_path.replace(os.sep, '/')
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+        # Only a bounded window of files is read ahead, so memory stays flat.
+        max_pending = max_workers * 2
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = collections.deque()
+            for rel_path_header, full_path in paths_to_process:
+                body_future = executor.submit(_render_file_body, full_path, rel_path_header, args)
+                pending.append((full_path, rel_path_header, body_future))
+                if len(pending) >= max_pending:
+                    _write_file_entry(fout, *pending.popleft())
+            while pending:
+                _write_file_entry(fout, *pending.popleft())
 
-            fout.write(f'# --- File: {rel_path_header} ---\n')
-            
-            try:
-                with open(full_path, 'r', encoding='utf-8') as fin:
-                    content = fin.read()
-                
-                current_file_basename = os.path.basename(full_path)
-                is_python_file = current_file_basename.lower().endswith('.py')
-                
-                # Flag to track if Python-specific processing (which includes blank line removal) occurred
-                python_specific_processing_done = False
-
-                if args.strip_python_comments and is_python_file:
-                    try:
-                        content = remove_python_comments(content) # This also removes blank lines
-                        python_specific_processing_done = True
-                    except Exception as e_strip:
-                        sys.stderr.write(f"Warning: Could not strip comments from {rel_path}: {e_strip}. Using original content.\n")
-                
-                # Apply general blank line stripping if requested AND
-                # it's not a Python file OR it's a Python file but comment stripping was not done/enabled.
-                if args.strip_blank_lines:
-                    if not is_python_file: # Always apply to non-Python text files
-                        content = remove_blank_lines(content)
-                    elif is_python_file and not python_specific_processing_done: # Apply to .py only if SPC didn't already
-                        content = remove_blank_lines(content)
-                
-                fout.write(content)
-                # Both remove_python_comments and remove_blank_lines ensure a trailing \n for non-empty output.
-                # This final check handles cases where no stripping was done and the original file lacked a newline.
-                if content and not content.endswith('\n'):
-                    fout.write('\n')
-
-            except UnicodeDecodeError:
-                fout.write('binary file\n')
-            except Exception as e:
-                sys.stderr.write(f"Error processing file {rel_path}: {e}\n")
-                fout.write(f'Error processing file: {e}\n')
-            
-            fout.write(f'# --- End of File: {rel_path_header} ---\n\n')
+# A file header ("# --- File: <path> ---") or footer ("# --- End of File: ...") line.
+# The greedy path group ends at the last ' ---', so paths containing ' ---' survive.
+_BUNDLE_MARKER_RE = re.compile(r'# --- (?:File: (?P<path>.*) ---\s*$|End of File: )')
 
 def reverse_mode(input_file, target_dir):
     """
     Recreate directories and files from a concatenated project file.
     Correctly strips the trailing ' ---' from each file header.
     Handles paths with either / or \ as separators from the header.
+    The bundle is read line by line and each content line is written straight
+    into the file it belongs to, so memory use does not grow with the bundle.
     """
-    FILE_HEADER = '# --- File: '
-    FILE_FOOTER = '# --- End of File: '
     SECTION_HEADER = '# --- Concatenated Files ---'
 
     try:
-        with open(input_file, 'r', encoding='utf-8') as fin:
-            all_lines = fin.read().splitlines()
+        fin = open(input_file, 'r', encoding='utf-8', buffering=_IO_BUFFER_SIZE)
     except FileNotFoundError:
         sys.stderr.write(f"Error: Input file '{input_file}' not found.\n")
         return
@@ -182,71 +414,76 @@ def reverse_mode(input_file, target_dir):
         sys.stderr.write(f"Error reading input file '{input_file}': {e}\n")
         return
 
-    try:
-        start_idx = -1
-        for i, line_check in enumerate(all_lines):
-            if line_check.strip() == SECTION_HEADER:
-                start_idx = i
-                break
-        if start_idx == -1:
-            sys.stderr.write(f"Input file missing '{SECTION_HEADER}' header.\n")
-            return
-    except ValueError: 
-        sys.stderr.write(f"Input file missing '{SECTION_HEADER}' header.\n")
-        return
+    fout_rev = None
+    ends_with_newline = True
+    made_dirs = set()  # Directories already created, so each costs one makedirs
 
-    content_lines = all_lines[start_idx + 2:] 
-    
-    current_path_str_for_reverse = None
-    buffer_for_reverse = []
-
-    def _flush_current_file_for_reverse():
-        nonlocal current_path_str_for_reverse 
-        if current_path_str_for_reverse:
-            normalized_path = current_path_str_for_reverse.replace('/', os.sep).replace('\\', os.sep)
-            dest = os.path.join(target_dir, normalized_path)
-            
+    def _close_current_file_for_reverse():
+        nonlocal fout_rev
+        if fout_rev is not None:
             try:
-                os.makedirs(os.path.dirname(dest), exist_ok=True)
-            except OSError as e: 
-                sys.stderr.write(f"Error creating directory {os.path.dirname(dest)}: {e}\n")
-                current_path_str_for_reverse = None 
-                return
+                # Content taken from the bundle always ends with a newline.
+                if not ends_with_newline:
+                    fout_rev.write('\n')
+                fout_rev.close()
+            except OSError as e:
+                sys.stderr.write(f"Error writing file {fout_rev.name}: {e}\n")
+            fout_rev = None
 
-            content_to_write = '\n'.join(buffer_for_reverse)
-            
+    def _open_file_for_reverse(path_str):
+        nonlocal fout_rev, ends_with_newline
+        normalized_path = path_str.replace('/', os.sep).replace('\\', os.sep)
+        dest = os.path.join(target_dir, normalized_path)
+
+        dest_dir = os.path.dirname(dest)
+        if dest_dir not in made_dirs:
             try:
-                with open(dest, 'w', encoding='utf-8') as fout_rev:
-                    if content_to_write == 'binary file' and len(buffer_for_reverse) == 1:
-                        fout_rev.write('binary file\n')
-                    else:
-                        fout_rev.write(content_to_write)
-                        if content_to_write and not content_to_write.endswith('\n'):
-                            fout_rev.write('\n')
-            except IOError as e:
-                sys.stderr.write(f"Error writing file {dest}: {e}\n")
-            current_path_str_for_reverse = None 
-
-    for line in content_lines:
-        line_stripped_for_header_check = line.rstrip()
-        
-        if line.startswith(FILE_HEADER) and line_stripped_for_header_check.endswith(' ---'):
-            _flush_current_file_for_reverse() 
-            path_extract_part = line[len(FILE_HEADER):]
-            if ' ---' in path_extract_part:
-                 current_path_str_for_reverse = path_extract_part.rsplit(' ---', 1)[0].strip()
-            else: 
-                 sys.stderr.write(f"Warning: Malformed file header (missing ' ---' marker): {line}\n")
-                 current_path_str_for_reverse = None 
-            buffer_for_reverse = [] 
-        elif line.startswith(FILE_FOOTER): 
-            _flush_current_file_for_reverse()
-            buffer_for_reverse = [] 
-        else: 
-            if current_path_str_for_reverse: 
-                buffer_for_reverse.append(line)
-    
-    _flush_current_file_for_reverse() 
+                os.makedirs(dest_dir, exist_ok=True)
+            except OSError as e:
+                sys.stderr.write(f"Error creating directory {dest_dir}: {e}\n")
+                return
+            made_dirs.add(dest_dir)
+
+        try:
+            fout_rev = open(dest, 'w', encoding='utf-8', buffering=_IO_BUFFER_SIZE)
+        except OSError as e:
+            sys.stderr.write(f"Error writing file {dest}: {e}\n")
+        ends_with_newline = True
+
+    with fin:
+        try:
+            for line in fin:
+                if line.strip() == SECTION_HEADER:
+                    break
+            else:
+                sys.stderr.write(f"Input file missing '{SECTION_HEADER}' header.\n")
+                return
+            next(fin, None)  # Skip the blank line after the section header
+
+            for line in fin:
+                # Almost every line is file content; one slice rules out the regex for those.
+                marker = _BUNDLE_MARKER_RE.match(line) if line[:2] == '# ' else None
+                if marker is not None:
+                    _close_current_file_for_reverse()
+                    if marker.group('path') is not None:
+                        _open_file_for_reverse(marker.group('path').strip())
+                elif fout_rev is not None:
+                    try:
+                        fout_rev.write(line)
+                    except OSError as e:
+                        sys.stderr.write(f"Error writing file {fout_rev.name}: {e}\n")
+                        try:
+                            # Flushing the rest of the buffer fails the same way; already reported.
+                            fout_rev.close()
+                        except OSError:
+                            pass
+                        fout_rev = None
+                        continue
+                    ends_with_newline = line.endswith('\n')
+        except Exception as e:
+            sys.stderr.write(f"Error reading input file '{input_file}': {e}\n")
+        finally:
+            _close_current_file_for_reverse()
 
 def main():
     parser = argparse.ArgumentParser(
@@ -276,6 +513,11 @@ def main():
         action='store_true',
         help='(Forward mode only) Remove blank lines (empty or whitespace-only) from all text files. For .py files, this is only applied if --strip-python-comments is not active (as that option already handles it).'
     )
+    parser.add_argument(
+        '--strict',
+        action='store_true',
+        help='(Forward mode only) With --strip-python-comments, find comments with the slower tokenize module instead of the default regex scanner.'
+    )
 
     args = parser.parse_args()
 
@@ -289,15 +531,16 @@ def main():
     if args.forward:
         if not args.output:
             parser.error('--output is required for forward mode')
-        exclusions = load_exclusions(args.config)
+        # A new matcher per run, so cached decisions never leak between runs.
+        excluded = build_exclusion_matcher(load_exclusions(args.config))
         
         try:
-            with open(args.output, 'w', encoding='utf-8') as f:
-                f.write('# --- Project Structure ---\n\n')
-                tree_text = generate_tree_structure(args.root, exclusions)
-                f.write(tree_text)
+            with open(args.output, 'wb', buffering=_IO_BUFFER_SIZE) as f:
+                f.write(_TREE_HEADER)
+                tree_text = generate_tree_structure(args.root, excluded)
+                f.write(tree_text.encode('utf-8'))
             # Pass the full args object to concatenate_files
-            concatenate_files(args.root, exclusions, args.output, args)
+            concatenate_files(args.root, excluded, args.output, args)
             print(f"Project bundled into {args.output}")
         except IOError as e:
             sys.stderr.write(f"Error writing to output file {args.output}: {e}\n")